@@ -17,6 +17,7 @@ import struct
 import os
 import math
 import mathutils
+import numpy as np
 from bpy_extras.image_utils import load_image
 from bpy_extras.io_utils import unpack_list, unpack_face_list
 from math import pi, ceil, degrees, radians, copysign
@@ -142,21 +143,9 @@ def tmdpos_save(context, filepath):
         objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
         sorted_objects = sorted(objects, key=lambda obj: int(obj.name))
         
-        # Deselect all objects first
-        bpy.ops.object.select_all(action='DESELECT')        
-
         #OBJECTS
+        #Rotation and scale are baked into the vertices by the TMD exporter
         for obj in sorted_objects:
-            obj.select_set(True)  # Select the object
-            bpy.context.view_layer.objects.active = obj
-
-            # Ensure we are in Object Mode
-            if bpy.context.object.mode != 'OBJECT':
-                bpy.ops.object.mode_set(mode='OBJECT')
-            
-    	    # Apply all transformations to the object
-            bpy.ops.object.transform_apply(location=False, rotation=True, scale=True) #Bake rotation, but store location
-
             rot_x = 0 #math.degrees(obj.rotation_euler[0]) 
             rot_y = 0 #math.degrees(obj.rotation_euler[1]) 
             rot_z = 0 #math.degrees(obj.rotation_euler[2]) 
@@ -182,10 +171,6 @@ def tmdpos_save(context, filepath):
             pos_y = max(-32768, min(32767, int(round(pos_y))))
             pos_z = max(-32768, min(32767, int(round(pos_z))))
 
-            obj.location[0] = 0
-            obj.location[1] = 0
-            obj.location[2] = 0
-
             # Pack the position values into the bytearray in little-endian format
             temp_buf.extend(struct.pack('<hhh', pos_x, pos_y, pos_z))
 
@@ -195,6 +180,113 @@ def tmdpos_save(context, filepath):
 
 
 
+def mesh_corner_count(mesh):
+    #Corners as the viewer counts them, quads being two triangles
+    totals = np.zeros(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", totals)
+    return int(np.where(totals == 4, 6, totals).sum())
+
+def rotation_matrices(angles):
+    #Rx @ Ry @ Rz of (n, 3) radians, the viewer's 'XYZ' Euler order
+    #which is Blender's 'ZYX' rotation mode
+    c, s = np.cos(angles), np.sin(angles)
+    one, zero = np.ones(len(angles)), np.zeros(len(angles))
+    rx = np.stack([one, zero, zero, zero, c[:, 0], -s[:, 0], zero, s[:, 0], c[:, 0]], axis=1).reshape(-1, 3, 3)
+    ry = np.stack([c[:, 1], zero, s[:, 1], zero, one, zero, -s[:, 1], zero, c[:, 1]], axis=1).reshape(-1, 3, 3)
+    rz = np.stack([c[:, 2], -s[:, 2], zero, s[:, 2], c[:, 2], zero, zero, zero, one], axis=1).reshape(-1, 3, 3)
+    return rx @ ry @ rz
+
+def matrices_to_euler(matrices):
+    #Inverse of rotation_matrices, unwrapped so keys don't jump by a full turn
+    x = np.arctan2(-matrices[:, 1, 2], matrices[:, 2, 2])
+    y = np.arcsin(np.clip(matrices[:, 0, 2], -1.0, 1.0))
+    z = np.arctan2(-matrices[:, 0, 1], matrices[:, 0, 0])
+    return np.unwrap(np.stack([x, y, z], axis=1), axis=0)
+
+def fill_fcurve(action, obj, data_path, index, frames, values):
+    #Size the curve once and write every key in one call
+    if hasattr(action, "fcurve_ensure_for_datablock"):
+        # Layered actions from Blender 4.4, action.fcurves is gone in 5.0
+        fcurve = action.fcurve_ensure_for_datablock(obj, data_path, index=index, group_name=obj.name)
+    else:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=obj.name)
+    points = fcurve.keyframe_points
+    points.add(len(frames))
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+    points.foreach_set("co", co.ravel())
+    linear = bpy.types.Keyframe.bl_rna.properties["interpolation"].enum_items["LINEAR"].value
+    points.foreach_set("interpolation", np.full(len(frames), linear, dtype=np.int32))
+    fcurve.update()
+    return fcurve
+
+def read_tmdanm(context, filepath, member="*", root_motion=False):
+    if not filepath:
+        raise ValueError("Filepath is not provided")
+
+    if not os.path.exists(filepath):
+        raise FileNotFoundError(f"File not found: {filepath}")
+
+    import psxtmd
+
+    objects = [obj for obj in bpy.context.scene.objects if obj.type == 'MESH']
+    sorted_objects = sorted(objects, key=lambda obj: int(obj.name))
+
+    #Decode every clip for the bones the viewer would animate
+    active = psxtmd.bone_lookup([mesh_corner_count(obj.data) for obj in sorted_objects])
+    clips = None
+    if psxtmd.is_archive(filepath):
+        # Same member selection as the TMD import, the first match is decoded
+        for prefix, archive, names in psxtmd.select_members(filepath, member):
+            if names:
+                clips = psxtmd.parse_anm(archive[names[0]], active)
+                break
+    else:
+        with open(filepath, 'rb') as file:
+            clips = psxtmd.parse_anm(file.read(), active)
+    if not clips:
+        return 0
+
+    start = context.scene.frame_start
+    rotation_scale = 2.0 * math.pi / psxtmd.ANM_ANGLE
+
+    #One action per clip and bone, keyed on top of the bind pose
+    for column, bone in enumerate(np.flatnonzero(active).tolist()):
+        obj = sorted_objects[bone]
+        bind_rotation = np.array(obj.matrix_basis.to_3x3().normalized(), dtype=np.float64)
+        bind_location = np.array(obj.location, dtype=np.float64)
+        obj.rotation_mode = 'ZYX'
+        animation_data = obj.animation_data or obj.animation_data_create()
+
+        first = None
+        for clip in clips:
+            action = bpy.data.actions.new(f"{clip.name}_{obj.name}")
+            action.use_fake_user = True
+            # Layered actions only take curves for an object they are assigned to
+            animation_data.action = action
+            frames = clip.frames + start
+
+            angles = clip.rotations[:, column] * rotation_scale
+            euler = matrices_to_euler(bind_rotation @ rotation_matrices(angles))
+            for axis in range(3):
+                fill_fcurve(action, obj, "rotation_euler", axis, frames, euler[:, axis])
+
+            if root_motion and bone == 0 and clip.translations is not None:
+                location = bind_location + clip.translations
+                for axis in range(3):
+                    fill_fcurve(action, obj, "location", axis, frames, location[:, axis])
+
+            if first is None:
+                first = action
+
+        animation_data.action = first
+
+    if len(clips[0].frames):
+        context.scene.frame_end = start + int(clips[0].frames.max())
+    bpy.context.view_layer.update()
+    return len(clips)
+
 
 # Operator definition
 from bpy.props import StringProperty
@@ -212,6 +304,32 @@ class ImportTMDPos(Operator, ImportHelper):
         
         return {'FINISHED'}
 
+class ImportTMDAnm(Operator, ImportHelper):
+    bl_idname = "import_scene.tmd_anm"
+    bl_label = "Import TMD Anm"
+    filename_ext = ".tmd_anm"
+
+    member: StringProperty(
+            name="Archive Member",
+            description="Member holding the animation in a WAD.WAD or DOT1 archive, wildcards allowed, the first match is used. Use <wad member>/<dot member> for DOTs inside a WAD",
+            default="*",
+            )
+    root_motion: BoolProperty(
+            name="Root Motion",
+            description="Key the root part's translation stream as well. The viewer plays rotations only",
+            default=False,
+            )
+
+    def execute(self, context):
+        filepath = self.filepath
+        count = read_tmdanm(context, filepath, self.member, self.root_motion)
+        if not count:
+            self.report({'WARNING'}, "No playable animations found")
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f"Imported {count} animation(s)")
+        return {'FINISHED'}
+
 class ExportTMDPos(bpy.types.Operator, ExportHelper):
     bl_idname = "export_scene.tmd_pos"
     bl_label = 'Export TMD Pos'
@@ -225,21 +343,28 @@ class ExportTMDPos(bpy.types.Operator, ExportHelper):
 def menu_func_importtmdpos(self, context):
     self.layout.operator(ImportTMDPos.bl_idname, text="TMDPos (.tmd_pos)")
 
+def menu_func_importtmdanm(self, context):
+    self.layout.operator(ImportTMDAnm.bl_idname, text="TMDAnm (.tmd_anm)")
+
 def menu_func_exporttmdpos(self, context):
     self.layout.operator(ExportTMDPos.bl_idname, text="TMDPos (.tmd_pos)")
 
 
 def register():
     bpy.utils.register_class(ImportTMDPos)
+    bpy.utils.register_class(ImportTMDAnm)
     bpy.utils.register_class(ExportTMDPos)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_importtmdpos)
+    bpy.types.TOPBAR_MT_file_import.append(menu_func_importtmdanm)
     bpy.types.TOPBAR_MT_file_export.append(menu_func_exporttmdpos)
 
 
 def unregister():
     bpy.utils.unregister_class(ImportTMDPos)
+    bpy.utils.unregister_class(ImportTMDAnm)
     bpy.utils.unregister_class(ExportTMDPos)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_importtmdpos)
+    bpy.types.TOPBAR_MT_file_import.remove(menu_func_importtmdanm)
     bpy.types.TOPBAR_MT_file_export.remove(menu_func_exporttmdpos)
 
     
@@ -0,0 +1,68 @@
+#PSX TMD codec in plain Python and NumPy, usable without Blender
+from .format import (
+        ModeBitFlags,
+        FlagBitFlags,
+        ClutCoordinates,
+        TexturePageAttributes,
+        PrimitiveType,
+        TmdPacket,
+        TMD_ID,
+        TMD_HEADER_SIZE,
+        TMD_OBJECT_SIZE,
+        )
+from .mesh import (
+        FACE_UVS,
+        FACE_RGB,
+        FACE_GOURAUD,
+        FACE_QUAD,
+        TmdMesh,
+        TmdFile,
+        face_flags_from_modes,
+        )
+from .reader import (
+        Model,
+        Primitive,
+        TMDTree,
+        decode_primitives,
+        read_vector_table,
+        parse,
+        )
+from .writer import (
+        NormalGrid,
+        packNormal,
+        encode_mesh,
+        encode_primitives,
+        write,
+        serialize,
+        )
+from .pos import (
+        TMD_POS_ENTRY,
+        parse_pos,
+        serialize_pos,
+        )
+from .wad import (
+        WAD_ID,
+        WadMember,
+        WadArchive,
+        is_archive,
+        select_members,
+        )
+from .dot import (
+        DotArchive,
+        )
+from .cache import (
+        ParseCache,
+        )
+from .tim import (
+        TIM_ID,
+        Vram,
+        TextureCache,
+        texture_cache,
+        is_tim,
+        )
+from .anm import (
+        ANM_ANGLE,
+        AnmClip,
+        bone_lookup,
+        parse_anm,
+        )
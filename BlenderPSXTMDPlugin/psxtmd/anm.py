@@ -0,0 +1,150 @@
+#TMD_ANM animation sets decoded into per-clip NumPy key arrays
+import struct
+import numpy as np
+
+ANM_ANGLE = 4096        #Rotation units per full turn
+MAX_BONES = 15
+MAX_BONE_DEPTH = 5
+
+class AnmClip:
+    #One animation: frames (keys,), rotations (keys, bones, 3) in ANM_ANGLE units
+    #for the active bones, translations (keys, 3) of bone 0 or None
+    __slots__ = ('name', 'anim_type', 'frame_count', 'bones', 'frames', 'rotations', 'translations')
+
+    def __init__(self, name, anim_type, frame_count, bones, frames, rotations, translations):
+        self.name = name
+        self.anim_type = anim_type
+        self.frame_count = frame_count
+        self.bones = bones
+        self.frames = frames
+        self.rotations = rotations
+        self.translations = translations
+
+def bone_lookup(corner_counts):
+    #Objects animated by the clips, same rules as the viewer's generateBoneLookup:
+    #parts over 9 corners chain onto the previous one, small parts hang off the
+    #current root, and only the first 15 parts less than 5 deep get key streams
+    active = np.zeros(len(corner_counts), dtype=bool)
+    depths = np.zeros(len(corner_counts), dtype=np.int32)
+    count = 0
+    root = 0
+    last_large = 0
+    root_change = 0
+    for i, corners in enumerate(corner_counts):
+        significant = corners > 9
+        if i == 0:
+            depth = 0
+        elif significant:
+            depth = depths[last_large] + 1
+            last_large = i
+            if root_change == 2:
+                root = i
+                root_change += 1
+        else:
+            depth = depths[root] + 1
+            if last_large != root:
+                root_change += 1
+            last_large = root
+        depths[i] = depth
+        if significant and depth < MAX_BONE_DEPTH and count < MAX_BONES:
+            active[i] = True
+            count += 1
+    return active
+
+def read_offsets(data, start):
+    #u32 offsets relative to start, up to a zero
+    offsets = []
+    pos = start
+    while pos + 4 <= len(data):
+        rel = struct.unpack_from('<I', data, pos)[0]
+        if rel == 0:
+            break
+        offsets.append(start + rel)
+        pos += 4
+    return offsets
+
+def read_toc(data):
+    #Entry offsets and clip names from the table of contents and symbol table
+    toc, symbols = struct.unpack_from('<II', data, 0) if len(data) >= 8 else (0, 0)
+    entries = read_offsets(data, toc) if toc else []
+    names = []
+    for start in (read_offsets(data, symbols) if symbols else []):
+        end = data.find(b"\0", start)
+        names.append(data[start:end if end >= 0 else len(data)].decode('latin-1').strip())
+    return entries or [0], names
+
+def decode_packed_rotations(packed):
+    #Types 4 and 6: 10-bit X and Y, 12-bit Z in one int32
+    packed = packed.astype(np.int32)
+    rx = ((packed << 2) >> 22) * 4
+    ry = ((packed << 12) >> 22) * 4
+    rz = -((packed << 22) >> 20)
+    return np.stack([rx, ry, rz], axis=-1)
+
+def decode_packed_translations(packed):
+    packed = packed.astype(np.int64)
+    tx = ((packed >> 21) - 0x400) * 2
+    ty = ((packed >> 11) & 0x3FF) * -2
+    tz = ((packed & 0x7FF) - 0x400) * 2
+    return np.stack([tx, ty, tz], axis=-1)
+
+def decode_clip(data, offset, active, name):
+    #One TOC entry, None for types the viewer does not play either
+    if offset + 8 > len(data):
+        return None
+    anim_type = struct.unpack_from('<H', data, offset)[0]
+    payload = offset + 2
+    frame_count = struct.unpack_from('<H', data, payload)[0]
+    bones = np.flatnonzero(active)
+    has_root = bool(len(active)) and bool(active[0])
+
+    # Words per frame: every active bone's rotation, then bone 0's translation
+    # Types 5 and 6 prefix each frame with its frame number
+    if anim_type in (3, 5):
+        word, per_bone, frame_word, records = '<i2', 3, '<u2', payload + 6
+    elif anim_type == 4:
+        word, per_bone, frame_word, records = '<u4', 1, None, payload + 6
+    elif anim_type == 6:
+        word, per_bone, frame_word, records = '<u4', 1, '<u4', payload + 10
+    else:
+        return None
+    size = per_bone * (len(bones) + has_root)
+    fields = [('keys', word, (size,))]
+    if anim_type in (5, 6):
+        fields.insert(0, ('frame', frame_word))
+    layout = np.dtype(fields)
+
+    count = min(frame_count, max(0, (len(data) - records) // layout.itemsize))
+    table = np.frombuffer(data, dtype=layout, count=count, offset=records)
+    keys = table['keys'].reshape(count, size)
+    frames = table['frame'].astype(np.int32) if anim_type in (5, 6) else np.arange(count, dtype=np.int32)
+
+    translations = None
+    if has_root:
+        translations = keys[:, per_bone:2 * per_bone]
+        keys = np.concatenate([keys[:, :per_bone], keys[:, 2 * per_bone:]], axis=1)
+    if anim_type in (3, 5):
+        rotations = keys.reshape(count, len(bones), 3).astype(np.int32)
+        rotations[..., 2] *= -1
+        if translations is not None:
+            translations = translations.astype(np.int32)
+    else:
+        rotations = decode_packed_rotations(keys.view(np.int32))
+        if translations is not None:
+            translations = decode_packed_translations(translations[:, 0])
+
+    return AnmClip(name, anim_type, frame_count, bones, frames, rotations, translations)
+
+def parse_anm(data, active):
+    #Every playable clip of a TMD_ANM file; active is bone_lookup's mask
+    data = bytes(data)
+    entries, names = read_toc(data)
+    clips = []
+    for index, offset in enumerate(entries):
+        name = names[index] if index < len(names) and names[index] else None
+        clip = decode_clip(data, offset, active, name)
+        if clip is not None:
+            if clip.name is None:
+                clip.name = f"Anim_{index}_t{clip.anim_type:02x}"
+            clips.append(clip)
+    return clips
@@ -0,0 +1,108 @@
+#On-disk cache of parsed TMD files, mapped back with np.load(mmap_mode='r')
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+from .mesh import TmdMesh, TmdFile
+from .reader import parse
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Every TmdMesh array; each is stored once for all objects, concatenated on axis 0
+MESH_FIELDS = ('vertices', 'normals', 'face_offsets', 'corner_vertices', 'corner_normals',
+               'corner_uvs', 'cba', 'tsb', 'mode', 'flag', 'rgb', 'face_flags')
+
+def content_key(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def entry_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+class ParseCache:
+    #One folder per file content, least recently used folders go first
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_SIZE):
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "psxtmd_cache")
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def load(self, key):
+        path = self.entry_path(key)
+        try:
+            with open(os.path.join(path, "tmd.json")) as file:
+                meta = json.load(file)
+            if meta.get('version') != CACHE_VERSION:
+                return None
+            arrays = {field: np.load(os.path.join(path, field + ".npy"), mmap_mode='r')
+                      for field in MESH_FIELDS}
+        except (OSError, ValueError):
+            return None
+        # Mark as recently used
+        os.utime(path)
+
+        counts = np.array(meta['counts'], dtype=np.int64).reshape(-1, len(MESH_FIELDS))
+        starts = np.zeros_like(counts)
+        np.cumsum(counts[:-1], axis=0, out=starts[1:])
+        meshes = []
+        for name, start, count in zip(meta['names'], starts.tolist(), counts.tolist()):
+            fields = [arrays[field][s:s + n] for field, s, n in zip(MESH_FIELDS, start, count)]
+            meshes.append(TmdMesh(name, *fields))
+        return TmdFile(meshes, meta['flags'])
+
+    def store(self, key, tmd):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.entry_path(key)
+        if os.path.isdir(path):
+            return
+        #Written next to the cache and renamed, so readers never see half an entry
+        temp = tempfile.mkdtemp(prefix=".tmp_", dir=self.directory)
+        try:
+            for field in MESH_FIELDS:
+                parts = [np.asarray(getattr(mesh, field)) for mesh in tmd.meshes]
+                array = np.concatenate(parts) if parts else np.zeros(0)
+                np.save(os.path.join(temp, field + ".npy"), array)
+            meta = {
+                'version': CACHE_VERSION,
+                'flags': tmd.flags,
+                'names': [mesh.name for mesh in tmd.meshes],
+                'counts': [len(getattr(mesh, field)) for mesh in tmd.meshes for field in MESH_FIELDS],
+                }
+            with open(os.path.join(temp, "tmd.json"), 'w') as file:
+                json.dump(meta, file)
+            os.rename(temp, path)
+        except OSError:
+            shutil.rmtree(temp, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        #Drop the least recently used entries until the folder fits max_bytes
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and not entry.name.startswith("."):
+                entries.append((entry.stat().st_mtime, entry_size(entry.path), entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def parse(self, data):
+        #psxtmd.parse, skipped entirely when the same bytes were parsed before
+        key = content_key(data)
+        tmd = self.load(key)
+        if tmd is None:
+            tmd = parse(data)
+            self.store(key, tmd)
+        return tmd
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
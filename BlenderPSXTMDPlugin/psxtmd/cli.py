@@ -0,0 +1,124 @@
+#Headless batch conversion, one process pool job per input file
+import argparse
+import concurrent.futures
+import glob
+import os
+import time
+import numpy as np
+
+from .reader import parse
+from .writer import serialize
+from .pos import parse_pos
+
+def normalize_job(data, out_path):
+    #TMD -> TMD through the codec
+    tmd = parse(data)
+    with open(out_path, 'wb') as file:
+        file.write(serialize(tmd))
+    return f"{len(tmd)} objects"
+
+def arrays_job(data, out_path):
+    #TMD -> .npz with every TmdMesh array, keyed "<object>/<field>"
+    tmd = parse(data)
+    arrays = {'flags': np.array(tmd.flags)}
+    for index, mesh in enumerate(tmd.meshes):
+        for field in mesh.__slots__:
+            if field not in ('name', 'dedup_normals'):
+                arrays[f"{index}/{field}"] = getattr(mesh, field)
+    np.savez(out_path, **arrays)
+    return f"{len(tmd)} objects"
+
+def pos_job(data, out_path):
+    #TMD_POS -> CSV
+    entries = parse_pos(data)
+    with open(out_path, 'w') as file:
+        file.write("index,rot_x,rot_y,rot_z,pos_x,pos_y,pos_z\n")
+        for index, (rot, pos) in enumerate(entries.tolist()):
+            file.write(f"{index},{rot[0]},{rot[1]},{rot[2]},{pos[0]},{pos[1]},{pos[2]}\n")
+    return f"{len(entries)} entries"
+
+# job name: (function, input extension, output extension)
+JOBS = {
+    'normalize': (normalize_job, '.tmd', '.tmd'),
+    'arrays': (arrays_job, '.tmd', '.npz'),
+    'pos': (pos_job, '.tmd_pos', '.csv'),
+}
+
+def glob_root(pattern):
+    #Leading directories of a glob pattern that hold no wildcards
+    root = pattern
+    while glob.has_magic(root):
+        root = os.path.dirname(root)
+    return root or '.'
+
+def collect_inputs(patterns, extension):
+    #(path, relative output name) of every input, directories are walked
+    inputs = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(extension):
+                        path = os.path.join(root, name)
+                        inputs.append((path, os.path.relpath(path, pattern)))
+        elif glob.has_magic(pattern):
+            # Keep the folders below the pattern's fixed part, so **/ doesn't flatten the tree
+            root = glob_root(pattern)
+            for path in sorted(glob.glob(pattern, recursive=True)):
+                if os.path.isfile(path):
+                    inputs.append((path, os.path.relpath(path, root)))
+        else:
+            inputs.append((pattern, os.path.basename(pattern)))
+    return inputs
+
+def run_job(job, path, out_path):
+    #Runs in the worker, never raises so one bad file does not stop the batch
+    function = JOBS[job][0]
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        message = function(data, out_path)
+        ok = True
+    except Exception as e:
+        message = f"{type(e).__name__}: {e}"
+        ok = False
+    return path, ok, time.perf_counter() - start, message
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="psxtmd", description="Batch convert PSX TMD files without Blender")
+    parser.add_argument('job', choices=sorted(JOBS), help="conversion to run on every input")
+    parser.add_argument('inputs', nargs='+', help="files, directories or glob patterns")
+    parser.add_argument('-o', '--output', required=True, help="output directory")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="worker processes")
+    args = parser.parse_args(argv)
+
+    function, extension, out_extension = JOBS[args.job]
+    inputs = collect_inputs(args.inputs, extension)
+    if not inputs:
+        parser.error("no input files found")
+
+    # Workers would overwrite each other's results, refuse before starting any
+    outputs = {}
+    for path, rel in inputs:
+        out_path = os.path.join(args.output, os.path.splitext(rel)[0] + out_extension)
+        other = outputs.setdefault(os.path.normcase(os.path.normpath(out_path)), path)
+        if other != path:
+            parser.error(f"{other} and {path} would both write {out_path}")
+
+    start = time.perf_counter()
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        jobs = [executor.submit(run_job, args.job, path,
+                                os.path.join(args.output, os.path.splitext(rel)[0] + out_extension))
+                for path, rel in inputs]
+        for job in concurrent.futures.as_completed(jobs):
+            path, ok, seconds, message = job.result()
+            failed += not ok
+            print(f"{'ok' if ok else 'FAIL':4} {seconds:8.3f}s  {path}  {message}")
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(inputs) - failed}/{len(inputs)} files converted in {elapsed:.2f}s with {args.jobs} workers")
+    return 1 if failed else 0
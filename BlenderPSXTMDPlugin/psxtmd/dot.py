@@ -0,0 +1,123 @@
+#DOT1 archives: a u32 header, then u32 member offsets up to a zero
+import collections
+import fnmatch
+import mmap
+import os
+import numpy as np
+
+DOT_TABLE = 4
+TABLE_CHUNK = 256
+TABLE_CACHE_SIZE = 64
+
+# Member tables already built, keyed by file identity so reopening is free
+table_cache = collections.OrderedDict()
+
+def read_offset_table(data):
+    #Offsets in stored order, read a chunk at a time until the terminating zero
+    count = (len(data) - DOT_TABLE) // 4
+    chunks = []
+    pos = 0
+    while pos < count:
+        n = min(TABLE_CHUNK, count - pos)
+        chunk = np.frombuffer(data, dtype='<u4', count=n, offset=DOT_TABLE + pos * 4)
+        end = np.flatnonzero(chunk == 0)
+        if len(end):
+            chunks.append(chunk[:end[0]])
+            break
+        chunks.append(chunk)
+        pos += n
+    if not chunks:
+        return np.zeros(0, dtype=np.uint32)
+    return np.concatenate(chunks).astype(np.uint32)
+
+def build_table(data):
+    #Same member order and sizes as DOTunpack: sorted by offset, last one runs to the end
+    offsets = read_offset_table(data)
+    order = np.argsort(offsets, kind='stable')
+    starts = offsets[order].astype(np.int64)
+    sizes = np.diff(np.append(starts, len(data)))
+    return order, starts, sizes
+
+def cached_table(key, data):
+    if key is None:
+        return build_table(data)
+    table = table_cache.get(key)
+    if table is None:
+        table = build_table(data)
+        table_cache[key] = table
+        if len(table_cache) > TABLE_CACHE_SIZE:
+            table_cache.popitem(last=False)
+    else:
+        table_cache.move_to_end(key)
+    return table
+
+class DotArchive:
+    #Members are "file_00000" in offset order, like DOTunpack extracts them
+    def __init__(self, data, key=None):
+        if len(data) < DOT_TABLE + 4:
+            raise ValueError("Not a DOT1 archive: too short")
+        self.data = memoryview(data)
+        self.header = int(np.frombuffer(self.data, dtype='<u4', count=1)[0])
+        # original[i] is the stored table index of member i (the .dhed mapping)
+        self.original, self.offsets, self.sizes = cached_table(key, self.data)
+        self.file = None
+        self.mm = None
+
+    @classmethod
+    def open(cls, path):
+        file = open(path, 'rb')
+        try:
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            st = os.fstat(file.fileno())
+            dot = cls(mm, key=(os.path.abspath(path), st.st_size, st.st_mtime_ns))
+        except Exception:
+            file.close()
+            raise
+        dot.file = file
+        dot.mm = mm
+        return dot
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def names(self):
+        return [f"file_{i:05d}" for i in range(len(self.offsets))]
+
+    def index(self, name):
+        if isinstance(name, str):
+            if not name.startswith("file_"):
+                raise KeyError(name)
+            name = int(name[5:])
+        if not 0 <= name < len(self.offsets):
+            raise KeyError(name)
+        return name
+
+    def __getitem__(self, name):
+        #Zero-copy view of one member, by name or sorted index
+        i = self.index(name)
+        start = int(self.offsets[i])
+        return self.data[start:start + int(self.sizes[i])]
+
+    def entry(self, original_index):
+        #Member at a position of the stored offset table
+        return self[int(np.flatnonzero(self.original == original_index)[0])]
+
+    def match(self, pattern):
+        pattern = pattern.lower()
+        return [name for name in self.names() if fnmatch.fnmatchcase(name, pattern)]
+
+    def close(self):
+        try:
+            self.data.release()
+            if self.mm is not None:
+                self.mm.close()
+        except BufferError:
+            pass
+        if self.file is not None:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
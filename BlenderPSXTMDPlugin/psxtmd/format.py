@@ -0,0 +1,237 @@
+#Bit flags, packet layouts and table entries of the TMD format
+import numpy as np
+from enum import Enum
+
+class ModeBitFlags:
+    ENTITY_TYPE_MASK = 0b111 << 0  # bits 0-2
+    # Define bit positions using hexadecimal
+    BRIGHTNESS = 0x1      # 0th bit (hex 1)
+    TRANSPARENCY = 0x2    # 1st bit (hex 2)
+    TEXTURE = 0x4         # 2nd bit (hex 4)
+    QUAD = 0x8            # 3rd bit (hex 8)
+    GOURAUD = 0x10        # 4th bit (hex 10)
+    BIT_5 = 0x20          # 5th bit (hex 20)
+    
+    # Entity type masks
+    POLYGON = 0b001  # 001 = Polygon (triangle, quadrilateral)
+    LINE = 0b010     # 010 = Straight line
+    SPRITE = 0b011   # 011 = Sprite
+
+    def __init__(self, mode):
+        self.mode = mode
+
+    @property
+    def entity_type(self):
+        return self.mode & self.ENTITY_TYPE_MASK
+
+    @property
+    def is_brightness(self):
+        return bool(self.mode & self.BRIGHTNESS)
+
+    @property
+    def is_transparency(self):
+        return bool(self.mode & self.TRANSPARENCY)
+
+    @property
+    def is_texture(self):
+        return bool(self.mode & self.TEXTURE)
+
+    @property
+    def is_quad(self):
+        return bool(self.mode & self.QUAD)
+
+    @property
+    def is_gouraud(self):
+        return bool(self.mode & self.GOURAUD)
+
+    @property
+    def is_bit_5(self):
+        return bool(self.mode & self.BIT_5)
+
+    def get_entity_type_name(self):
+        entity_type = self.entity_type
+        if entity_type == self.POLYGON:
+            return "Polygon (triangle, quadrilateral)"
+        elif entity_type == self.LINE:
+            return "Straight line"
+        elif entity_type == self.SPRITE:
+            return "Sprite"
+        else:
+            return "Unknown"
+        
+    def __str__(self):
+        return (
+            f"Brightness: {self.is_brightness}\n"
+            f"Transparency: {self.is_transparency}\n"
+            f"Texture: {self.is_texture}\n"
+            f"Quad: {self.is_quad}\n"
+            f"Gouraud: {self.is_gouraud}\n"
+            f"Bit 5: {self.is_bit_5}"
+        )
+#usage flags = ModeBitFlags(mode)
+
+class FlagBitFlags:
+    # Define bit positions using hexadecimal
+    LIGHT_SOURCE = 0x1      # 0th bit (hex 1)
+    TWO_SIDED = 0x2         # 1st bit (hex 2)
+    GRADATION = 0x4         # 2nd bit (hex 4)
+
+    def __init__(self, flag):
+        self.flag = flag
+
+    @property
+    def is_light_source(self):
+        return bool(self.flag & self.LIGHT_SOURCE)
+
+    @property
+    def is_two_sided(self):
+        return bool(self.flag & self.TWO_SIDED)
+
+    @property
+    def is_gradation(self):
+        return bool(self.flag & self.GRADATION)
+
+    def __str__(self):
+        return (
+            f"Do not calculate light sourcing: {self.is_light_source}\n"
+            f"Polygon is double sided: {self.is_two_sided}\n"
+            f"Gradated: {self.is_gradation}"
+        )
+
+# Example usage
+#flags = Flag(flag_value)
+
+class ClutCoordinates:
+    def __init__(self, cba):
+        self.cba = cba
+
+    @property
+    def clut_x(self):
+        return (self.cba % 64) * 16
+
+    @property
+    def clut_y(self):
+        return self.cba // 64
+
+    def __str__(self):
+        return f"clutX: {self.clut_x}, clutY: {self.clut_y}"
+
+# Example usage
+#clut_coords = ClutCoordinates(cba_value)
+
+class TexturePageAttributes:
+    def __init__(self, tsb):
+        self.tsb = tsb
+
+    @property
+    def texture_page(self):
+        return self.tsb & 0x1F  # Extract bits 0-4
+
+    @property
+    def semitransparency_rate(self):
+        return (self.tsb >> 5) & 0x03  # Extract bits 5-6 (0..3)
+
+    @property
+    def colour_mode(self):
+        return (self.tsb >> 7) & 0x03  # Extract bits 7-8 (0..2)
+
+    def __str__(self):
+        return (
+            f"Texture Page: {self.texture_page}\n"
+            f"Semitransparency Rate: {self.semitransparency_rate}\n"
+            f"Colour Mode: {self.colour_mode}"
+        )
+
+# Example usage
+
+#attributes = TexturePageAttributes(tsb_value)
+
+class PrimitiveType(Enum):
+    NoneType = 0
+    Triangle = 1
+    Quad = 2
+    StraightLine = 3
+    Sprite = 4
+    StripMesh = 5
+
+class TmdPacket:
+    @staticmethod
+    def build(flag, mode, ilen, primitiveType):
+        flagmode = (mode + (flag << 8))
+
+        packet_classes = {
+            0x0020: FFPacket,
+            0x0030: GFPacket,
+            0x0024: FTPacket,
+            0x0121: NFPacket,
+            0x0034: GTPacket,
+            0x0036: GTPacket
+        }
+
+        if flagmode in packet_classes:
+            return packet_classes[flagmode]
+        else:
+            raise ValueError(f"Unrecognized flag: 0x{flagmode:x} ({ilen})")
+
+
+# Primitive header shared by every packet layout
+PRIM_HEADER = [('olen', 'u1'), ('ilen', 'u1'), ('flag', 'u1'), ('mode', 'u1')]
+PRIM_RGB = [('red', 'u1'), ('green', 'u1'), ('blue', 'u1'), ('pmode', 'u1')]
+PRIM_UVS = [('u1', 'u1'), ('v1', 'u1'), ('CBA', '<u2'),
+            ('u2', 'u1'), ('v2', 'u1'), ('TSB', '<u2'),
+            ('u3', 'u1'), ('v3', 'u1'), ('pad1', '<u2')]
+PRIM_UVS_QUAD = PRIM_UVS + [('u4', 'u1'), ('v4', 'u1'), ('pad2', '<u2')]
+
+def prim_shorts(*names):
+    return [(name, '<u2') for name in names]
+
+
+class FFPacket:
+    #Flat Shading No texture
+    is_uvs = False
+    is_rgb = True
+    tri = np.dtype(PRIM_HEADER + PRIM_RGB + prim_shorts('normal1', 'vert1', 'vert2', 'vert3'))
+    quad = np.dtype(PRIM_HEADER + PRIM_RGB + prim_shorts('normal1', 'vert1', 'vert2', 'vert3', 'vert4', 'pad1'))
+
+    @classmethod
+    def layout(cls, primitiveType):
+        return cls.quad if primitiveType == PrimitiveType.Quad else cls.tri
+
+class GFPacket(FFPacket):
+    #Gourad Shading No Texture
+    tri = np.dtype(PRIM_HEADER + PRIM_RGB + prim_shorts('normal1', 'vert1', 'normal2', 'vert2', 'normal3', 'vert3'))
+    quad = np.dtype(PRIM_HEADER + PRIM_RGB + prim_shorts('normal1', 'vert1', 'normal2', 'vert2', 'normal3', 'vert3',
+                                                        'normal4', 'vert4'))
+
+class FTPacket(FFPacket):
+    #Flat Shading Texture
+    is_uvs = True
+    is_rgb = False
+    tri = np.dtype(PRIM_HEADER + PRIM_UVS + prim_shorts('normal1', 'vert1', 'vert2', 'vert3'))
+    quad = np.dtype(PRIM_HEADER + PRIM_UVS_QUAD + prim_shorts('normal1', 'vert1', 'vert2', 'vert3', 'vert4', 'pad3'))
+
+class GTPacket(FTPacket):
+    #Gourad Shading Textured
+    tri = np.dtype(PRIM_HEADER + PRIM_UVS + prim_shorts('normal1', 'vert1', 'normal2', 'vert2', 'normal3', 'vert3'))
+    quad = np.dtype(PRIM_HEADER + PRIM_UVS_QUAD + prim_shorts('normal1', 'vert1', 'normal2', 'vert2', 'normal3', 'vert3',
+                                                             'normal4', 'vert4'))
+
+class NFPacket(FFPacket):
+    #No Shading Flat No Texture
+    tri = np.dtype(PRIM_HEADER + PRIM_RGB + prim_shorts('vert1', 'vert2', 'vert3', 'pad1'))
+    quad = np.dtype(PRIM_HEADER + PRIM_RGB + prim_shorts('vert1', 'vert2', 'vert3', 'vert4'))
+
+
+# File header: id, flags, object count, then one table entry per object
+TMD_ID = 0x41
+TMD_HEADER_SIZE = 12
+TMD_OBJECT_SIZE = 28
+
+# VRTS/NRML entry: int16 x, y, z + int16 pad
+TMD_VECTOR = np.dtype([('x', '<i2'), ('y', '<i2'), ('z', '<i2'), ('pad', '<i2')])
+
+def fixed_16_to_float(value):
+    return value if value == 0 else value / 4096.0
+
+def float_to_fixed_16(value):
+    return value if value == 0 else int(round(value * 4096)).to_bytes(1, "little", signed=True)[0]
@@ -0,0 +1,122 @@
+#Struct-of-arrays mesh shared by the reader and the writer
+import numpy as np
+
+from .format import ModeBitFlags, PrimitiveType
+
+# Packed per-face flags of TmdMesh.face_flags
+FACE_UVS = 0x1
+FACE_RGB = 0x2
+FACE_GOURAUD = 0x4
+FACE_QUAD = 0x8
+
+def face_flags_from_modes(modes):
+    #FACE_* bits of every face from its packet mode byte
+    modes = np.asarray(modes)
+    textured = (modes & ModeBitFlags.TEXTURE) != 0
+    face_flags = np.where(textured, FACE_UVS, FACE_RGB)
+    face_flags |= np.where(modes & ModeBitFlags.GOURAUD, FACE_GOURAUD, 0)
+    face_flags |= np.where(modes & ModeBitFlags.QUAD, FACE_QUAD, 0)
+    return face_flags.astype(np.uint8)
+
+class TmdMesh:
+    #Struct-of-arrays geometry of one TMD object, faces are stored as
+    #flat corner arrays delimited by face_offsets
+    __slots__ = ('name', 'vertices', 'normals', 'face_offsets', 'corner_vertices', 'corner_normals',
+                 'corner_uvs', 'cba', 'tsb', 'mode', 'flag', 'rgb', 'face_flags', 'dedup_normals')
+
+    def __init__(self, name, vertices, normals, face_offsets, corner_vertices, corner_normals,
+                 corner_uvs, cba, tsb, mode, flag, rgb, face_flags, dedup_normals=False):
+        self.name = name
+        self.vertices = vertices                #(n, 3) int16, float when built for export
+        self.normals = normals                  #(n, 3) float32
+        self.face_offsets = face_offsets        #(faces + 1) int32
+        self.corner_vertices = corner_vertices  #(corners) int32
+        self.corner_normals = corner_normals    #(corners) int32, flat faces repeat their normal
+        self.corner_uvs = corner_uvs            #(corners, 2) uint8, raw TMD u, v
+        self.cba = cba                          #(faces) uint16
+        self.tsb = tsb                          #(faces) uint16
+        self.mode = mode                        #(faces) uint8
+        self.flag = flag                        #(faces) uint8
+        self.rgb = rgb                          #(faces, 3) uint8
+        self.face_flags = face_flags            #(faces) uint8, FACE_* bits
+        #Parsed meshes keep their normal table and indices on export,
+        #per-corner normals from Blender are merged into a table instead
+        self.dedup_normals = dedup_normals
+
+    @classmethod
+    def from_model(cls, model):
+        runs = model.primitives
+
+        corner_vertices, corner_normals, corner_uvs = [], [], []
+        cba, tsb, mode, flag, rgb, face_flags = [], [], [], [], [], []
+        for run in runs:
+            count = len(run)
+            corner_vertices.append(run.vertex_indices().ravel())
+            normals = run.normal_indices()
+            if normals.shape[1] != run.corners:
+                normals = np.repeat(normals, run.corners, axis=1)
+            corner_normals.append(normals.ravel())
+            corner_uvs.append(run.uvs().reshape(-1, 2))
+            cba.append(run.cba())
+            tsb.append(run.tsb())
+            rgb.append(run.rgb())
+            mode.append(np.full(count, run.mode, dtype=np.uint8))
+            flag.append(np.full(count, run.flag, dtype=np.uint8))
+            bits = ((FACE_UVS if run.packet.is_uvs else 0) |
+                    (FACE_RGB if run.packet.is_rgb else 0) |
+                    (FACE_GOURAUD if run.is_gouraud else 0) |
+                    (FACE_QUAD if run.primitiveType == PrimitiveType.Quad else 0))
+            face_flags.append(np.full(count, bits, dtype=np.uint8))
+
+        face_sizes = [np.full(len(run), run.corners, dtype=np.int32) for run in runs]
+        face_offsets = np.zeros(sum(len(run) for run in runs) + 1, dtype=np.int32)
+        if runs:
+            np.cumsum(np.concatenate(face_sizes), out=face_offsets[1:])
+
+        def join(parts, dtype, shape=()):
+            if not parts:
+                return np.zeros((0,) + shape, dtype=dtype)
+            return np.concatenate(parts).astype(dtype, copy=False)
+
+        return cls(model.name, model.verts, model.normals, face_offsets,
+                   join(corner_vertices, np.int32), join(corner_normals, np.int32),
+                   join(corner_uvs, np.uint8, (2,)), join(cba, np.uint16), join(tsb, np.uint16),
+                   join(mode, np.uint8), join(flag, np.uint8), join(rgb, np.uint8, (3,)),
+                   join(face_flags, np.uint8))
+
+    @property
+    def face_count(self):
+        return len(self.face_offsets) - 1
+
+    @property
+    def corner_counts(self):
+        return np.diff(self.face_offsets)
+
+    @property
+    def is_uvs(self):
+        return (self.face_flags & FACE_UVS) != 0
+
+    @property
+    def is_rgb(self):
+        return (self.face_flags & FACE_RGB) != 0
+
+    @property
+    def is_gouraud(self):
+        return (self.face_flags & FACE_GOURAUD) != 0
+
+    @property
+    def is_quad(self):
+        return (self.face_flags & FACE_QUAD) != 0
+
+
+class TmdFile:
+    #Header flags and the objects of one TMD file, in table order
+    def __init__(self, meshes=None, flags=0):
+        self.meshes = meshes if meshes is not None else []
+        self.flags = flags
+
+    def __len__(self):
+        return len(self.meshes)
+
+    def __iter__(self):
+        return iter(self.meshes)
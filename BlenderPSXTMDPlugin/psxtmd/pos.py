@@ -0,0 +1,12 @@
+#TMD_POS files: rotation and position of every object, int16 each
+import numpy as np
+
+TMD_POS_ENTRY = np.dtype([('rot', '<i2', 3), ('pos', '<i2', 3)])
+
+def parse_pos(data):
+    #Whole entries only, a trailing partial entry is ignored
+    count = len(data) // TMD_POS_ENTRY.itemsize
+    return np.frombuffer(data, dtype=TMD_POS_ENTRY, count=count)
+
+def serialize_pos(entries):
+    return np.ascontiguousarray(entries, dtype=TMD_POS_ENTRY).tobytes()
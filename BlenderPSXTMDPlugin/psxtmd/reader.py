@@ -0,0 +1,290 @@
+#TMD parsing, everything stays a view over the file bytes where possible
+import logging
+import struct
+import numpy as np
+
+from .format import TMD_ID, TMD_HEADER_SIZE, TMD_OBJECT_SIZE, TMD_VECTOR, ModeBitFlags, PrimitiveType, TmdPacket
+from .mesh import TmdMesh, TmdFile
+
+logger = logging.getLogger(__name__)
+
+class dotdict(dict):
+    __getattr__ = dict.get
+    __setattr__ = dict.__setitem__
+
+
+class Primitive:
+    #Run of consecutive primitives sharing one (olen, ilen, flag, mode) header
+    def __init__(self, olen, ilen, flag, mode):
+        self.olen = olen
+        self.ilen = ilen
+        self.flag = flag
+        self.mode = mode
+        self.packets = None
+
+        modebits = ModeBitFlags(self.mode)
+        entity_type = modebits.entity_type
+        self.is_gouraud = modebits.is_gouraud
+
+        #Set entity
+        self.primitiveType = PrimitiveType.NoneType
+        if entity_type == ModeBitFlags.POLYGON:
+            if not modebits.is_quad:
+                #Triangle
+                self.primitiveType = PrimitiveType.Triangle
+            else:
+                #Quad    
+                self.primitiveType = PrimitiveType.Quad
+        elif entity_type == ModeBitFlags.LINE:
+            #Line
+            self.primitive_type = PrimitiveType.StraightLine        
+        elif entity_type == ModeBitFlags.SPRITE:
+            #Sprite
+            self.primitive_type = PrimitiveType.Sprite    
+
+        self.packet = TmdPacket.build(self.flag, self.mode, self.ilen, self.primitiveType)
+        self.layout = self.packet.layout(self.primitiveType)
+        self.corners = 4 if self.primitiveType == PrimitiveType.Quad else 3
+
+    def __len__(self):
+        return len(self.packets)
+
+    def _columns(self, prefix):
+        names = [f"{prefix}{i}" for i in range(1, self.corners + 1)]
+        names = [name for name in names if name in self.layout.names]
+        return np.stack([self.packets[name] for name in names], axis=1)
+
+    def vertex_indices(self):
+        return self._columns('vert')
+
+    def normal_indices(self):
+        #One column for flat packets, one per corner for gouraud ones
+        if 'normal1' not in self.layout.names:
+            return np.zeros((len(self), 1), dtype=np.uint16)
+        return self._columns('normal')
+
+    def uvs(self):
+        if not self.packet.is_uvs:
+            return np.zeros((len(self), self.corners, 2), dtype=np.uint8)
+        return np.stack([self._columns('u'), self._columns('v')], axis=2)
+
+    def cba(self):
+        if not self.packet.is_uvs:
+            return np.zeros(len(self), dtype=np.uint16)
+        return self.packets['CBA']
+
+    def tsb(self):
+        if not self.packet.is_uvs:
+            return np.zeros(len(self), dtype=np.uint16)
+        return self.packets['TSB']
+
+    def rgb(self):
+        if not self.packet.is_rgb:
+            return np.zeros((len(self), 3), dtype=np.uint8)
+        return np.stack([self.packets['red'], self.packets['green'], self.packets['blue']], axis=1)
+
+
+def decode_primitives(data, offset, count):
+    #Scan the primitive stream once, slicing runs of identical headers
+    #into structured arrays of the matching packet layout
+    runs = []
+    while count > 0:
+        olen, ilen, flag, mode = data[offset:offset + 4]
+        run = Primitive(olen, ilen, flag, mode)
+        size = run.layout.itemsize
+        limit = min(count, (len(data) - offset) // size)
+        if limit <= 0:
+            raise ValueError(f"Primitive data truncated at 0x{offset:x}")
+
+        #Headers of the following packets, assuming they share this layout
+        headers = np.ndarray((limit,), dtype='<u4', buffer=data, offset=offset, strides=(size,))
+        head = headers[0]
+        n = 1
+        step = 16
+        while n < limit:
+            stop = min(limit, n + step)
+            diff = np.flatnonzero(headers[n:stop] != head)
+            if diff.size:
+                n += int(diff[0])
+                break
+            n = stop
+            step *= 2
+
+        run.packets = np.frombuffer(data, dtype=run.layout, count=n, offset=offset)
+        runs.append(run)
+        offset += n * size
+        count -= n
+    return runs
+
+
+class ByteBuffer:
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def seek(self, offset):
+        #Table addresses count from the end of the file header
+        self.position = offset + TMD_HEADER_SIZE
+
+    def read_byte(self):
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def read_short(self):
+        value = struct.unpack_from('h', self.data, self.position)[0]
+        self.position += 2
+        return value
+
+    def read_int(self):
+        value = struct.unpack_from('i', self.data, self.position)[0]
+        self.position += 4
+        return value
+
+def read_vector_table(data, offset, count):
+    #Zero-copy (count, 3) int16 view over a VRTS/NRML table
+    table = np.frombuffer(data, dtype=TMD_VECTOR, count=count, offset=offset)
+    return table.view('<i2').reshape(count, 4)[:, :3]
+
+class Model:
+    def __init__(self, data, flags, offset, name):
+        #offset is where this object's entry sits in the object table
+        self.name = name
+        self.verts = None
+        self.normals = None
+        self.primitives = []
+        self.flags = flags
+        (self.vertAddress, self.nVert,
+         self.normalAddress, self.nNorm,
+         self.primitiveAddress, self.nPrimitive,
+         self.scale) = struct.unpack_from('7i', data, offset)
+
+    def populate(self, data):
+        #Only FIXP 0 (addresses relative to the object table) is handled
+        if self.flags != 0:
+            raise ValueError(f"Unrecognized TMD header flags: {self.flags}")
+        logger.debug("input model %s: vertAddress 0x%x normalAddress 0x%x primitiveAddress 0x%x",
+                     self.name, self.vertAddress, self.normalAddress, self.primitiveAddress)
+
+        byte_buffer = ByteBuffer(data)
+
+        #Vertices stay int16 views over the file bytes
+        byte_buffer.seek(self.vertAddress)
+        self.verts = read_vector_table(data, byte_buffer.position, self.nVert)
+
+        #Normals are 1.3.12 fixed point, scaled to float in one step
+        byte_buffer.seek(self.normalAddress)
+        normals = read_vector_table(data, byte_buffer.position, self.nNorm)
+        self.normals = normals * np.float32(1.0 / 4096.0)
+
+        #Primitives are decoded in runs of identical packet headers
+        byte_buffer.seek(self.primitiveAddress)
+        self.primitives = decode_primitives(data, byte_buffer.position, self.nPrimitive)
+
+
+def parse(data):
+    #TMD bytes to a TmdFile, meshes keep views over data
+    #Every table is read in place at its absolute offset, nothing is sliced per object
+    id, flags, nObj = struct.unpack_from('iii', data, 0)
+    logger.debug("id: 0x%x, %d objects", id & 0xFFFFFFFF, nObj)
+    if id != TMD_ID or nObj < 0:
+        raise ValueError(f"Not a TMD file (id 0x{id & 0xFFFFFFFF:x}, {nObj} objects)")
+
+    meshes = []
+    offset = TMD_HEADER_SIZE
+    for indexb in range(nObj):
+        name = str(indexb)
+        model = Model(data, flags, offset, name)
+        model.populate(data)
+        meshes.append(TmdMesh.from_model(model))
+
+        offset += TMD_OBJECT_SIZE  # Update offset for the next model
+
+    return TmdFile(meshes, flags)
+
+
+class TMDParser:
+    def __init__(self):
+        self.fp = None
+
+    def cb_result(self):
+        return True
+
+    def parse(self, objList):
+            for model in objList:
+                self.parsePart('NODE', model)
+                self.parsePart('MESH', model)
+            return self.cb_result()
+                
+ 
+    def parsePart(self, chunk, data):
+            if chunk=='NODE':
+                self.cb_next()
+                name = data.name                
+                self.cb_data(chunk, {'name':name})                
+            elif chunk=='MESH':
+                #Arrays are handed over as-is, nothing is copied per face
+                self.cb_data(chunk, {'mesh':data})
+
+        
+
+class TMDList(TMDParser):
+    def __init__(self):
+        TMDParser.__init__(self)
+        self.index = -1
+        self.data = dotdict()
+        self.data.nodes = []
+
+    def cb_next(self):
+        self.data.nodes.append(dotdict())
+        parent = self.index
+        self.index = len(self.data.nodes)-1
+        self.data.nodes[self.index].parent = -1
+
+    def cb_prev(self):
+        self.index = self.data.nodes[self.index].parent
+
+    def cb_data(self, chunk, data):
+        if self.index != -1:
+            node = self.data.nodes[self.index]
+
+        if chunk in ['NODE','MESH']:
+            node.update(data)
+
+    def cb_result(self):
+        return self.data
+
+
+class TMDTree(TMDList):
+    def __init__(self):
+        TMDList.__init__(self)
+
+    def cb_result(self):
+        tree = []
+        nodes = self.data.nodes
+
+        for node in nodes:
+            node.nodes = []
+
+        for i, node in enumerate(nodes):
+            if node.parent == -1:
+                tree.append(node)
+            else:
+                nodes[node.parent].nodes.append(node)
+            del node['parent']
+
+        self.data.update({'nodes':tree})
+        return self.data
+
+
+class TexturePageExtractor:
+    def __init__(self, node):
+        self.node = node
+
+    def extract_unique_texture_pages(self):
+        texture_pages = self.node.mesh.tsb & 0x1F  # Extract bits 0-4 for texture_page
+        return set(texture_pages.tolist())
+#usage
+# # Extract unique texture pages
+#extractor = TexturePageExtractor(node)
+#unique_texture_pages = extractor.extract_unique_texture_pages()
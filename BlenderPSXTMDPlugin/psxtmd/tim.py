@@ -0,0 +1,175 @@
+#TIM images decoded into an emulated 1024x512 VRAM, and texture pages read back out of it
+import collections
+import hashlib
+import struct
+import numpy as np
+
+TIM_ID = 0x10
+TIM_CLUT = 0x8
+VRAM_WIDTH = 1024
+VRAM_HEIGHT = 512
+PAGE_WIDTH = 64         #VRAM words per texture page
+TEXTURE_SIZE = 256      #Texels addressable by a primitive's u, v
+DEFAULT_TEXTURE_CACHE = 64 * 1024 * 1024
+
+# TexturePageAttributes.colour_mode values
+COLOUR_4BIT = 0
+COLOUR_8BIT = 1
+COLOUR_15BIT = 2
+
+def is_tim(data):
+    if len(data) < 8:
+        return False
+    id, flags = struct.unpack_from('<II', data, 0)
+    return id == TIM_ID and (flags & ~0xF) == 0
+
+def page_origin(tpage):
+    #VRAM x, y of a TexturePageAttributes.texture_page
+    return (tpage & 0xF) * PAGE_WIDTH, ((tpage >> 4) & 1) * 256
+
+def clut_origin(cba):
+    #Same as ClutCoordinates.clut_x, clut_y
+    return (cba & 0x3F) * 16, (cba >> 6) & (VRAM_HEIGHT - 1)
+
+def rgba_from_words(words):
+    #15-bit PSX colours to RGBA bytes, black and magenta are the transparent keys
+    words = words.astype(np.uint16)
+    rgba = np.empty(words.shape + (4,), dtype=np.uint8)
+    rgba[..., 0] = (words & 31) << 3
+    rgba[..., 1] = ((words >> 5) & 31) << 3
+    rgba[..., 2] = ((words >> 10) & 31) << 3
+    rgb = words & 0x7FFF
+    rgba[..., 3] = np.where((rgb == 0) | (rgb == 0x7C1F), 0, 255)
+    return rgba
+
+class Vram:
+    def __init__(self):
+        self.words = np.zeros((VRAM_HEIGHT, VRAM_WIDTH), dtype=np.uint16)
+        self.loaded = 0
+        # texture_key results, valid until the next upload
+        self.keys = {}
+
+    def read_block(self, data, offset):
+        #One TIM block (length, x, y, w, h, then w*h words)
+        #Returns x, y, the (h, w) words and the offset past the block
+        length, dx, dy, w, h = struct.unpack_from('<IHHHH', data, offset)
+        block = np.frombuffer(data, dtype='<u2', count=w * h, offset=offset + 12).reshape(h, w)
+        return dx, dy, block, offset + 12 + block.nbytes
+
+    def blit(self, dx, dy, block):
+        #Clipped to VRAM
+        w = max(0, min(block.shape[1], VRAM_WIDTH - dx))
+        h = max(0, min(block.shape[0], VRAM_HEIGHT - dy))
+        self.words[dy:dy + h, dx:dx + w] = block[:h, :w]
+
+    def load_tim(self, data):
+        #Copy the CLUT and image blocks of a TIM where they belong in VRAM
+        #Both blocks are read first, so a truncated TIM leaves VRAM untouched
+        if not is_tim(data):
+            return False
+        flags = struct.unpack_from('<I', data, 4)[0]
+        offset = 8
+        blocks = []
+        try:
+            if flags & TIM_CLUT:
+                dx, dy, block, offset = self.read_block(data, offset)
+                blocks.append((dx, dy, block))
+            dx, dy, block, offset = self.read_block(data, offset)
+            blocks.append((dx, dy, block))
+        except (struct.error, ValueError):
+            return False
+        for dx, dy, block in blocks:
+            self.blit(dx, dy, block)
+        self.loaded += 1
+        self.keys.clear()
+        return True
+
+    def has_page(self, tpage):
+        #Anything uploaded to the page's 64x256 words
+        x, y = page_origin(tpage)
+        return bool(self.words[y:y + 256, x:x + PAGE_WIDTH].any())
+
+    def clut(self, cba, count):
+        x, y = clut_origin(cba)
+        row = np.zeros(count, dtype=np.uint16)
+        entries = self.words[y, x:x + count]
+        row[:len(entries)] = entries
+        return row
+
+    def source(self, tpage, cba, colour_mode):
+        #VRAM words a texture is decoded from: the texel block and its CLUT row
+        #8 and 15-bit pages run on into the following VRAM columns
+        x, y = page_origin(tpage)
+        texels_per_word = {COLOUR_4BIT: 4, COLOUR_8BIT: 2}.get(colour_mode, 1)
+        span = TEXTURE_SIZE // texels_per_word
+        words = np.zeros((TEXTURE_SIZE, span), dtype=np.uint16)
+        block = self.words[y:y + TEXTURE_SIZE, x:x + span]
+        words[:block.shape[0], :block.shape[1]] = block
+        clut = self.clut(cba, 16 if colour_mode == COLOUR_4BIT else 256) if texels_per_word > 1 else None
+        return words, clut
+
+    def texture_key(self, tpage, cba, colour_mode):
+        #(tpage, clut_x, clut_y, colour mode, hash of the source words)
+        #Equal keys decode to equal textures, whichever Vram they come from
+        key = self.keys.get((tpage, cba, colour_mode))
+        if key is None:
+            words, clut = self.source(tpage, cba, colour_mode)
+            digest = hashlib.blake2b(words.tobytes(), digest_size=8)
+            clut_x, clut_y = 0, 0
+            if clut is not None:
+                digest.update(clut.tobytes())
+                clut_x, clut_y = clut_origin(cba)
+            key = (tpage, clut_x, clut_y, colour_mode, digest.hexdigest())
+            self.keys[(tpage, cba, colour_mode)] = key
+        return key
+
+    def texture(self, tpage, cba, colour_mode):
+        #(256, 256, 4) RGBA bytes as a primitive samples them, row 0 is v = 0
+        words, clut = self.source(tpage, cba, colour_mode)
+        if colour_mode == COLOUR_4BIT:
+            shifts = np.array([0, 4, 8, 12], dtype=np.uint16)
+            indices = (words[..., None] >> shifts) & 0xF
+            colours = clut[indices.reshape(TEXTURE_SIZE, TEXTURE_SIZE)]
+        elif colour_mode == COLOUR_8BIT:
+            shifts = np.array([0, 8], dtype=np.uint16)
+            indices = (words[..., None] >> shifts) & 0xFF
+            colours = clut[indices.reshape(TEXTURE_SIZE, TEXTURE_SIZE)]
+        else:
+            colours = words
+        return rgba_from_words(colours)
+
+
+class TextureCache:
+    #Decoded textures shared by every Vram in the process, keyed by
+    #Vram.texture_key, least recently used ones dropped past max_bytes
+    def __init__(self, max_bytes=DEFAULT_TEXTURE_CACHE):
+        self.max_bytes = max_bytes
+        self.textures = collections.OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, vram, tpage, cba, colour_mode):
+        #Read-only RGBA array, decoded on the first request only
+        key = vram.texture_key(tpage, cba, colour_mode)
+        texture = self.textures.get(key)
+        if texture is not None:
+            self.textures.move_to_end(key)
+            self.hits += 1
+            return texture
+
+        self.misses += 1
+        texture = vram.texture(tpage, cba, colour_mode)
+        texture.flags.writeable = False
+        self.textures[key] = texture
+        self.nbytes += texture.nbytes
+        while self.nbytes > self.max_bytes and len(self.textures) > 1:
+            _, dropped = self.textures.popitem(last=False)
+            self.nbytes -= dropped.nbytes
+        return texture
+
+    def clear(self):
+        self.textures.clear()
+        self.nbytes = 0
+
+texture_cache = TextureCache()
@@ -0,0 +1,160 @@
+#PWF archives (WAD.WAD), members are memoryviews over one read-only mmap
+import fnmatch
+import mmap
+import os
+import struct
+import numpy as np
+
+WAD_ID = b"PWF "
+WAD_TABLE = 0x800
+WAD_SECTOR = 0x800
+EWDF_ID = b"EWDF"
+EWDF_EXTRACT = 0x80
+
+# Original archive entry: 3-byte sector offset, 3-byte size, flags in the last byte
+WAD_ENTRY = np.dtype([('offset', 'u1', 3), ('pad1', 'u1', 2), ('size', 'u1', 3), ('pad2', 'u1', 12), ('flags', 'u1')])
+# Repacked archive entry
+WAD_ENTRY_PACKED = np.dtype([('offset', '<u4'), ('size', '<u4')])
+
+def le24(field):
+    field = field.astype(np.uint32)
+    return field[:, 0] | (field[:, 1] << 8) | (field[:, 2] << 16)
+
+class WadMember:
+    __slots__ = ('name', 'offset', 'size', 'crc')
+
+    def __init__(self, name, offset, size, crc=None):
+        self.name = name
+        self.offset = offset
+        self.size = size
+        self.crc = crc
+
+class WadArchive:
+    #Same member names as WADConsole extracts: "<crc>_<name>" or "file_00000"
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.file.close()
+            raise
+        st = os.fstat(self.file.fileno())
+        self.key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        self.data = memoryview(self.mm)
+        self.members = []
+        self.index = {}
+        try:
+            self.read_table()
+        except Exception:
+            self.close()
+            raise
+
+    def read_table(self):
+        data = self.data
+        if len(data) < WAD_TABLE + 8 or bytes(data[:4]) != WAD_ID:
+            raise ValueError(f"Not a PWF archive: {self.path}")
+        files = struct.unpack_from('<I', data, 0x0C)[0]
+
+        # Repacked archives store plain u32 pairs, their top bytes are zero
+        test1, test2 = struct.unpack_from('<II', data, WAD_TABLE)
+        if (test1 >> 24) == 0 and (test2 >> 24) == 0:
+            count = min(files, (len(data) - WAD_TABLE) // WAD_ENTRY_PACKED.itemsize)
+            table = np.frombuffer(data, dtype=WAD_ENTRY_PACKED, count=count, offset=WAD_TABLE)
+            for i, (offset, size) in enumerate(table.tolist()):
+                self.add(WadMember(f"file_{i:05d}", offset, size))
+            return
+
+        count = min(files, (len(data) - WAD_TABLE) // WAD_ENTRY.itemsize)
+        table = np.frombuffer(data, dtype=WAD_ENTRY, count=count, offset=WAD_TABLE)
+        offsets = (le24(table['offset']) >> 8) * WAD_SECTOR
+        sizes = (le24(table['size']) >> 12) * 4
+        extract = (table['flags'] & EWDF_EXTRACT) != 0
+        for offset, size in zip(offsets[extract].tolist(), sizes[extract].tolist()):
+            if offset + 16 > len(data) or bytes(data[offset:offset + 4]) != EWDF_ID:
+                continue
+            xsize, header_size, crc = struct.unpack_from('<III', data, offset + 4)
+            end = self.mm.find(b"\0", offset + 16)
+            if end < 0:
+                end = len(data)
+            name = bytes(data[offset + 16:end]).decode('latin-1')
+            self.add(WadMember(f"{crc:08x}_{name}", offset + header_size, size - header_size, crc))
+
+    def add(self, member):
+        self.members.append(member)
+        self.index[member.name] = member
+
+    def __len__(self):
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getitem__(self, name):
+        #Zero-copy view of one member
+        member = self.index[name] if isinstance(name, str) else name
+        return self.data[member.offset:member.offset + member.size]
+
+    def dot(self, name):
+        #DOT1 archive stored in a member, its table cached per archive and member
+        from .dot import DotArchive
+        member = self.index[name] if isinstance(name, str) else name
+        return DotArchive(self[member], key=self.key + (member.offset,))
+
+    def names(self):
+        return [member.name for member in self.members]
+
+    def match(self, pattern):
+        #Members whose name matches a case-insensitive glob pattern
+        pattern = pattern.lower()
+        return [member for member in self.members if fnmatch.fnmatchcase(member.name.lower(), pattern)]
+
+    def close(self):
+        try:
+            self.data.release()
+            self.mm.close()
+        except BufferError:
+            # Member views are still alive, the map goes away with the last of them
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def is_archive(path):
+    #WAD.WAD by its magic, DOT1 archives only carry the extension
+    with open(path, 'rb') as file:
+        return file.read(4) == WAD_ID or path.lower().endswith(".dot")
+
+def select_members(path, pattern="*"):
+    #(prefix, archive, names) for every archive a member pattern reaches, in order
+    #"<wad member>/<dot member>" patterns reach into DOT1 members of a WAD.
+    #Each archive closes when the next one is requested, use its views before that
+    from .dot import DotArchive
+    pattern = pattern or "*"
+    with open(path, 'rb') as file:
+        is_wad = file.read(4) == WAD_ID
+    if not is_wad:
+        with DotArchive.open(path) as dot:
+            yield os.path.basename(path) + "/", dot, dot.match(pattern)
+        return
+
+    outer, _, inner = pattern.partition("/")
+    with WadArchive(path) as wad:
+        names = [member.name for member in wad.match(outer)]
+        if not inner:
+            yield "", wad, names
+            return
+        for name in names:
+            try:
+                dot = wad.dot(name)
+            except ValueError:
+                continue
+            with dot:
+                yield name + "/", dot, dot.match(inner)
@@ -0,0 +1,319 @@
+#TMD serialization, objects are encoded independently and stitched at the end
+import io
+import logging
+import math
+import shutil
+import struct
+import tempfile
+import numpy as np
+
+from .format import TMD_ID, TMD_OBJECT_SIZE, PrimitiveType, TmdPacket
+
+logger = logging.getLogger(__name__)
+
+def write_int(value):
+    return struct.pack("<i",value)
+
+def encode_vertex_table(coords):
+    #VRTS section: x, y, z truncated like int(), clamped to int16, plus filler
+    table = np.zeros((len(coords), 4), dtype='<i2')
+    table[:, :3] = np.clip(np.trunc(coords), -32768, 32767)
+    return table.tobytes()
+
+def packNormal(normal):
+ # Convert standard normal to constant-L1 normal
+    assert len(normal) == 3
+
+    norm = math.sqrt(normal[0] ** 2 + normal[1] ** 2 + normal[2] ** 2)
+    #norm = 1
+    if norm == 0:
+        # Handle the case where the norm is zero
+        normalized_normal = (0.0, 0.0, 0.0)
+    else:
+        normalized_normal = (normal[0] / norm, normal[1] / norm, normal[2] / norm)        
+
+    # Scale and convert to 16-bit fixed-point integers
+    packed_x = int(round(normalized_normal[0],8) * 4096)
+    packed_y = int(round(normalized_normal[1],8) * 4096)
+    packed_z = int(round(normalized_normal[2],8) * 4096)
+    
+    # Clamp values to ensure they fit within 16-bit signed integer range
+    packed_x = max(-32767, min(packed_x, 32767))
+    packed_y = max(-32767, min(packed_y, 32767))
+    packed_z = max(-32767, min(packed_z, 32767))
+
+    return packed_x, packed_y, packed_z
+
+
+class NormalGrid:
+    #Packed normals bucketed into cells of tolerance size. A normal within
+    #tolerance on every axis can only sit in one of the 27 neighbour cells,
+    #so lookups stay constant time instead of scanning every unique normal
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.cells = {}
+
+    def cell(self, normal):
+        t = self.tolerance
+        return (normal[0] // t, normal[1] // t, normal[2] // t)
+
+    def find(self, normal):
+        #Index of the first added normal within tolerance, like a linear scan
+        x, y, z = normal
+        t = self.tolerance
+        cx, cy, cz = self.cell(normal)
+        match = None
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for index, (ux, uy, uz) in self.cells.get((cx + dx, cy + dy, cz + dz), ()):
+                        if (abs(x - ux) < t and
+                            abs(y - uy) < t and
+                            abs(z - uz) < t and
+                            (match is None or index < match)):
+                            match = index
+        return match
+
+    def add(self, normal, index):
+        self.cells.setdefault(self.cell(normal), []).append((index, normal))
+
+
+def encode_normal_table(normals):
+    #Packed normals as one TMD normal table, filler included
+    table = np.zeros((len(normals), 4), dtype='<u2')
+    if len(normals):
+        table[:, :3] = np.asarray(normals, dtype=np.int64) & 0xFFFF
+    return table.tobytes()
+
+def primitive_lengths(modes, flags):
+    #olen/ilen of every face from its packet mode and flag
+    #Brightness and transparency bits (0x01, 0x02) do not change the packet size
+    kind = modes & 0x3C
+    gradation = (flags & 0x04) >> 2
+    light = flags & 0x01
+    kinds = [kind == 0x20, kind == 0x24, kind == 0x30, kind == 0x34]
+    ilen = np.select(kinds, [0x3 + gradation * 0x2, 0x5, 0x4 + gradation * 0x2 + (light << 0x1), 0x6 + (light << 0x1)], 0)
+    olen = np.select(kinds, [0x4 + gradation * 0x2, 0x7, 0x6, 0x9], 0)
+    return olen, ilen
+
+def encode_primitives(modes, flags, clut, txb, uvs, rgb, nit, vit):
+    #Serialize every triangle of an object into one preallocated buffer
+    #nit and vit hold the normal and vertex index of each face corner
+    modes = np.asarray(modes, dtype=np.int64)
+    flags = np.asarray(flags, dtype=np.int64)
+    olen, ilen = primitive_lengths(modes, flags)
+    sizes = 4 + ilen * 4
+    offsets = np.zeros(len(modes), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=offsets[1:])
+    buf = np.zeros(int(sizes.sum()), dtype=np.uint8)
+
+    #One structured array per packet kind, reusing the reader layouts
+    flagmodes = modes + (flags << 8)
+    for flagmode in np.unique(flagmodes).tolist():
+        faces = np.flatnonzero(flagmodes == flagmode)
+        mode = flagmode & 0xFF
+        flag = flagmode >> 8
+        size = int(sizes[faces[0]])
+        packet = TmdPacket.build(flag, mode, int(ilen[faces[0]]), PrimitiveType.Triangle)
+        layout = packet.layout(PrimitiveType.Triangle)
+        if layout.itemsize != size:
+            raise ValueError(f"Packet size mismatch for flag 0x{flagmode:x}")
+
+        packets = np.zeros(len(faces), dtype=layout)
+        packets['olen'] = olen[faces]
+        packets['ilen'] = ilen[faces]
+        packets['flag'] = flag
+        packets['mode'] = mode
+        if packet.is_rgb:
+            packets['red'] = rgb[faces, 0]
+            packets['green'] = rgb[faces, 1]
+            packets['blue'] = rgb[faces, 2]
+            packets['pmode'] = mode #padding
+        if packet.is_uvs:
+            for i in range(3):
+                packets[f'u{i + 1}'] = uvs[faces, i, 0]
+                packets[f'v{i + 1}'] = uvs[faces, i, 1]
+            packets['CBA'] = clut[faces]
+            packets['TSB'] = txb[faces]
+        for i in range(3):
+            packets[f'vert{i + 1}'] = vit[faces, i]
+            #Flat packets only store the first normal
+            if f'normal{i + 1}' in layout.names:
+                packets[f'normal{i + 1}'] = nit[faces, i]
+
+        buf[offsets[faces, None] + np.arange(size)] = packets.view(np.uint8).reshape(-1, size)
+
+    return buf.tobytes()
+
+def encode_mesh(mesh):
+    #VRTS, NRML and PRIM blocks of one TmdMesh, only touches its own arrays
+    #Module level so it can be handed to thread and process pools alike
+    if not mesh.dedup_normals or not len(mesh.normals):
+        return encode_indexed_mesh(mesh)
+
+    loop_normals = np.asarray(mesh.normals, dtype=np.float64)[mesh.corner_normals].tolist()
+    loop_vertices = mesh.corner_vertices.tolist()
+    loop_start = mesh.face_offsets[:-1]
+
+    unique_normals = []
+    vit_table = []
+    vit_table_set = {}
+    nit_table = []
+    nitnor_table = []
+    tolerance = 4
+    normal_grid = NormalGrid(tolerance)
+    custom_order = [0, 2, 1]
+
+    for start, total in zip(loop_start.tolist(), mesh.corner_counts.tolist()):
+        loop_indices = range(start, start + total)
+        for i in range(0, len(loop_indices), 3):
+            group = [loop_indices[i], loop_indices[i + 1], loop_indices[i + 2]]
+            reordered_group = [group[j] for j in custom_order]
+
+
+        for loop_index in reordered_group: 
+        
+        
+            lonorm = loop_normals[loop_index]
+            x, y, z = packNormal(lonorm)                
+            ltnorm = (x, y, z)
+            vertid = loop_vertices[loop_index]
+            is_unique = True
+
+            #Add to tables
+            vit_table.append(vertid) #Store loop.vertex_index just for giggles
+            nitnor_table.append(ltnorm) #Store truncated normal
+
+            #if normal appeared before
+            if vertid in vit_table_set:
+                is_unique = False
+                nit_ind = vit_table_set[vertid]
+            else:    
+                match = normal_grid.find(ltnorm)
+                if match is not None:
+                    is_unique = False
+                    nit_ind = match
+
+
+            if is_unique:                                 
+                nit_ind = len(unique_normals)
+                normal_grid.add(ltnorm, nit_ind) #Store position inside the unique normals table
+                vit_table_set[vertid] = nit_ind
+                unique_normals.append((x, y, z))  # Append actual normal to list of unique normals               
+                                    
+
+            nit_table.append(nit_ind)
+
+    #Tables are stored per face in loop order 0, 2, 1
+    nit = np.array(nit_table, dtype=np.int64).reshape(-1, 3)[:, [0, 2, 1]]
+    vit = np.array(vit_table, dtype=np.int64).reshape(-1, 3)[:, [0, 2, 1]]
+
+    uvs = mesh.corner_uvs[loop_start[:, None] + np.arange(3)]
+    prims = encode_primitives(mesh.mode, mesh.flag, mesh.cba, mesh.tsb, uvs, mesh.rgb, nit, vit)
+    return (encode_vertex_table(mesh.vertices), len(mesh.vertices),
+            encode_normal_table(unique_normals), len(unique_normals),
+            prims, mesh.face_count)
+
+def encode_indexed_mesh(mesh):
+    #Normal table and corner indices are written back as they are, flat and
+    #NF packets simply ignore the indices they have no field for
+    loop_start = mesh.face_offsets[:-1]
+    corners = loop_start[:, None] + np.arange(3)
+    normals = np.rint(np.asarray(mesh.normals, dtype=np.float64).reshape(-1, 3) * 4096)
+    normals = np.clip(normals, -32767, 32767)
+
+    nit = mesh.corner_normals[corners].astype(np.int64)
+    vit = mesh.corner_vertices[corners].astype(np.int64)
+    prims = encode_primitives(mesh.mode, mesh.flag, mesh.cba, mesh.tsb, mesh.corner_uvs[corners], mesh.rgb, nit, vit)
+    return (encode_vertex_table(mesh.vertices), len(mesh.vertices),
+            encode_normal_table(normals), len(normals),
+            prims, mesh.face_count)
+
+
+# Vertex and normal sections stay in memory up to this size before spilling to disk
+SPOOL_SIZE = 64 * 1024 * 1024
+
+def write(file, tmd, executor=None):
+    #Stream a TmdFile to a binary file object
+    #Objects are encoded through executor.submit when one is given
+    vert_off = []
+    vert_cnt = []
+    norm_off = []
+    norm_cnt = []
+    prim_off = []
+    prim_cnt = []
+
+    meshes = tmd.meshes
+    mesh_count = len(meshes)
+
+    # Primitives are streamed straight to the file, vertices and normals are
+    # spooled until the primitive section size is known
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as vert_file, \
+            tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as norm_file:
+        #FILE HEADER
+        file.write(write_int(TMD_ID))
+        file.write(write_int(tmd.flags))
+        file.write(write_int(mesh_count))
+
+        #Reserve the object table, patched once all offsets are known
+        table_start = file.tell()
+        file.write(bytes(mesh_count * TMD_OBJECT_SIZE))
+
+        #OBJECTS
+        if executor is None:
+            results = map(encode_mesh, meshes)
+        else:
+            results = [job.result() for job in [executor.submit(encode_mesh, mesh) for mesh in meshes]]
+
+        # Results are stitched in object order
+        for verts, nvert, norms, nnorm, prims, nprim in results:
+            vert_off.append(vert_file.tell())
+            vert_file.write(verts)
+            vert_cnt.append(nvert)
+
+            norm_off.append(norm_file.tell())
+            norm_file.write(norms)
+            norm_cnt.append(nnorm)
+
+            prim_off.append(file.tell() - table_start)
+            file.write(prims)
+            prim_cnt.append(nprim)
+
+        #Append the spooled sections after the primitives
+        vert_start = file.tell() - table_start
+        vert_file.seek(0)
+        shutil.copyfileobj(vert_file, file)
+        norm_start = file.tell() - table_start
+        norm_file.seek(0)
+        shutil.copyfileobj(norm_file, file)
+        end = file.tell()
+
+        #Patch the object table, addresses are relative to its start
+        table = bytearray()
+        for i in range(mesh_count):
+            vt = vert_start + vert_off[i]
+            table += write_int(vt)
+            table += write_int(vert_cnt[i])
+
+            nt = norm_start + norm_off[i]
+            table += write_int(nt)
+            table += write_int(norm_cnt[i])
+
+            pt = prim_off[i]
+            table += write_int(pt)
+            table += write_int(prim_cnt[i])
+
+            table.extend(b'\x00' * 4) #Pad
+
+            logger.debug("output model %d: vertAddress 0x%x normalAddress 0x%x primitiveAddress 0x%x",
+                         i, vt, nt, pt)
+
+        file.seek(table_start)
+        file.write(table)
+        file.seek(end)
+
+def serialize(tmd, executor=None):
+    #TmdFile to bytes
+    buf = io.BytesIO()
+    write(buf, tmd, executor)
+    return buf.getvalue()
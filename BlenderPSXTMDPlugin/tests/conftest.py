@@ -0,0 +1,5 @@
+import os
+import sys
+
+# psxtmd is imported straight from the addon folder, without bpy
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
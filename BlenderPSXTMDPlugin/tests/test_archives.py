@@ -0,0 +1,124 @@
+import struct
+
+import pytest
+
+import psxtmd
+
+
+def dot_bytes(members, order=None):
+    #DOT1 archive whose offset table lists members in the given order
+    order = list(range(len(members))) if order is None else order
+    table_size = 4 + 4 * (len(members) + 1)
+    offsets = []
+    pos = table_size
+    for member in members:
+        offsets.append(pos)
+        pos += len(member)
+    table = struct.pack('<I', 0) + b''.join(struct.pack('<I', offsets[i]) for i in order) + struct.pack('<I', 0)
+    return table + b''.join(members)
+
+
+def packed_wad_bytes(members):
+    #Repacked PWF archive: u32 offset, size pairs at 0x800, data on 0x800 sectors
+    data = bytearray(b"PWF " + bytes(8) + struct.pack('<I', len(members)))
+    data += bytes(0x800 - len(data))
+    pos = 0x1000
+    for member in members:
+        data += struct.pack('<II', pos, len(member))
+        pos += -(-len(member) // 0x800) * 0x800
+    data += bytes(0x1000 - len(data))
+    for member in members:
+        data += member + bytes(-len(member) % 0x800)
+    return bytes(data)
+
+
+def original_wad_bytes(members):
+    #Original PWF archive: 21-byte entries pointing at EWDF headed files
+    header_size = 32
+    data = bytearray(b"PWF " + bytes(8) + struct.pack('<I', len(members)))
+    data += bytes(0x800 - len(data))
+    entries = bytearray()
+    files = bytearray()
+    sector = 2
+    for crc, name, payload in members:
+        size = header_size + len(payload)
+        entries += (sector << 8).to_bytes(3, 'little') + bytes(2)
+        entries += ((size // 4) << 12).to_bytes(3, 'little') + bytes(12) + bytes([0x80])
+        body = b"EWDF" + struct.pack('<III', size, header_size, crc) + name.encode() + b"\0"
+        body += bytes(header_size - len(body)) + payload
+        files += body + bytes(-len(body) % 0x800)
+        sector += len(body + bytes(-len(body) % 0x800)) // 0x800
+    data += entries
+    data += bytes(0x1000 - len(data))
+    return bytes(data + files)
+
+
+def test_dot_members_follow_offset_order():
+    members = [b"A" * 8, b"B" * 12, b"C" * 4]
+    dot = psxtmd.DotArchive(dot_bytes(members, order=[2, 0, 1]))
+    assert len(dot) == 3
+    assert dot.names() == ["file_00000", "file_00001", "file_00002"]
+    assert [bytes(dot[name]) for name in dot.names()] == members
+    assert dot.sizes.tolist() == [8, 12, 4]
+    #The stored table listed C first
+    assert bytes(dot.entry(0)) == b"C" * 4
+    assert dot.match("FILE_0000[12]") == ["file_00001", "file_00002"]
+
+
+def test_dot_too_short():
+    with pytest.raises(ValueError):
+        psxtmd.DotArchive(bytes(4))
+
+
+def test_packed_wad(tmp_path):
+    path = tmp_path / "WAD.WAD"
+    path.write_bytes(packed_wad_bytes([b"first", b"x" * 0x900]))
+    with psxtmd.WadArchive(str(path)) as wad:
+        assert wad.names() == ["file_00000", "file_00001"]
+        assert bytes(wad["file_00000"]) == b"first"
+        assert len(wad["file_00001"]) == 0x900
+
+
+def test_original_wad(tmp_path):
+    payload = bytes(range(256))
+    path = tmp_path / "WAD.WAD"
+    path.write_bytes(original_wad_bytes([(0x1234abcd, "MODEL.TMD", payload), (0x42, "SKIN.TIM", b"t" * 64)]))
+    with psxtmd.WadArchive(str(path)) as wad:
+        assert wad.names() == ["1234abcd_MODEL.TMD", "00000042_SKIN.TIM"]
+        assert bytes(wad["1234abcd_MODEL.TMD"]) == payload
+        assert [member.crc for member in wad.match("*.tim")] == [0x42]
+
+
+def test_not_a_wad(tmp_path):
+    path = tmp_path / "WAD.WAD"
+    path.write_bytes(bytes(0x1000))
+    with pytest.raises(ValueError):
+        psxtmd.WadArchive(str(path))
+
+
+def test_select_members_reaches_into_dots(tmp_path):
+    dot = dot_bytes([b"tim", b"tmd", b"anm"])
+    path = tmp_path / "WAD.WAD"
+    path.write_bytes(packed_wad_bytes([dot, b"loose"]))
+    assert psxtmd.is_archive(str(path))
+
+    found = [(prefix, names, [bytes(archive[name]) for name in names])
+             for prefix, archive, names in psxtmd.select_members(str(path), "file_00000/file_0000[12]")]
+    assert found == [("file_00000/", ["file_00001", "file_00002"], [b"tmd", b"anm"])]
+
+    found = [(prefix, names) for prefix, archive, names in psxtmd.select_members(str(path), "*")]
+    assert found == [("", ["file_00000", "file_00001"])]
+
+
+def test_select_members_of_a_dot_file(tmp_path):
+    path = tmp_path / "CHAR.DOT"
+    path.write_bytes(dot_bytes([b"tim", b"tmd"]))
+    assert psxtmd.is_archive(str(path))
+    found = [(prefix, names) for prefix, archive, names in psxtmd.select_members(str(path), "")]
+    assert found == [("CHAR.DOT/", ["file_00000", "file_00001"])]
+
+
+def test_plain_file_is_not_an_archive(tmp_path):
+    path = tmp_path / "MODEL.TMD"
+    path.write_bytes(struct.pack('<iii', psxtmd.TMD_ID, 0, 0))
+    assert not psxtmd.is_archive(str(path))
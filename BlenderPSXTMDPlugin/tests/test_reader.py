@@ -0,0 +1,56 @@
+import struct
+
+import numpy as np
+import pytest
+
+import psxtmd
+
+
+def single_triangle():
+    #One flat untextured triangle, enough for a valid header and object table
+    mesh = psxtmd.TmdMesh(
+        "0",
+        np.array([[0, 0, 0], [100, 0, 0], [0, 100, 0]], dtype=np.int16),
+        np.array([[0, 0, 1]], dtype=np.float32),
+        np.array([0, 3], dtype=np.int32),
+        np.array([0, 1, 2], dtype=np.int32),
+        np.zeros(3, dtype=np.int32),
+        np.zeros((3, 2), dtype=np.uint8),
+        np.zeros(1, dtype=np.uint16),
+        np.zeros(1, dtype=np.uint16),
+        np.array([0x20], dtype=np.uint8),
+        np.zeros(1, dtype=np.uint8),
+        np.array([[255, 0, 0]], dtype=np.uint8),
+        psxtmd.face_flags_from_modes([0x20]),
+    )
+    return psxtmd.serialize(psxtmd.TmdFile([mesh]))
+
+
+def test_parse_single_triangle():
+    tmd = psxtmd.parse(single_triangle())
+    assert tmd.flags == 0
+    assert len(tmd) == 1
+    mesh = tmd.meshes[0]
+    assert mesh.vertices.tolist() == [[0, 0, 0], [100, 0, 0], [0, 100, 0]]
+    assert mesh.corner_vertices.tolist() == [0, 1, 2]
+    assert mesh.rgb.tolist() == [[255, 0, 0]]
+
+
+def test_nonzero_header_flags_rejected():
+    #FIXP 1 (absolute addresses) is not supported and must not import as empty meshes
+    data = bytearray(single_triangle())
+    struct.pack_into('<i', data, 4, 1)
+    with pytest.raises(ValueError, match="header flags"):
+        psxtmd.parse(bytes(data))
+
+
+def test_bad_id_rejected():
+    data = bytearray(single_triangle())
+    struct.pack_into('<i', data, 0, 0x42)
+    with pytest.raises(ValueError, match="Not a TMD"):
+        psxtmd.parse(bytes(data))
+
+
+def test_empty_file():
+    tmd = psxtmd.parse(struct.pack('<iii', psxtmd.TMD_ID, 0, 0))
+    assert len(tmd) == 0
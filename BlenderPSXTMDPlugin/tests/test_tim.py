@@ -0,0 +1,76 @@
+import struct
+
+import numpy as np
+
+import psxtmd
+from psxtmd.tim import COLOUR_4BIT, COLOUR_8BIT, COLOUR_15BIT
+
+RED = 0x001F
+GREEN = 0x03E0
+BLUE = 0x7C00
+WHITE = 0x7FFF
+
+
+def block(x, y, words):
+    words = np.asarray(words, dtype='<u2')
+    h, w = words.shape
+    return struct.pack('<IHHHH', 12 + words.nbytes, x, y, w, h) + words.tobytes()
+
+
+def tim_bytes(mode, image, clut=None):
+    #mode 0, 1, 2 for 4, 8 and 15-bit images, image and clut are (x, y, words)
+    flags = mode | (0x8 if clut is not None else 0)
+    data = struct.pack('<II', psxtmd.TIM_ID, flags)
+    if clut is not None:
+        data += block(*clut)
+    return data + block(*image)
+
+
+def rgba(words):
+    #Expected texels: 5-bit channels widened by 3 bits, black is transparent
+    words = np.asarray(words, dtype=np.uint16)
+    return np.stack([(words & 31) << 3, ((words >> 5) & 31) << 3, ((words >> 10) & 31) << 3,
+                     np.where(words == 0, 0, 255)], axis=-1).astype(np.uint8)
+
+
+def test_4bit_texture():
+    #Page 1 starts at VRAM x 64, its CLUT row sits at 0, 480
+    palette = [0, RED, GREEN, BLUE] + [WHITE] * 12
+    texels = np.array([[0, 1, 2, 3, 3, 2, 1, 0], [1, 1, 1, 1, 2, 2, 2, 2]])
+    words = texels[:, 0::4] | (texels[:, 1::4] << 4) | (texels[:, 2::4] << 8) | (texels[:, 3::4] << 12)
+
+    vram = psxtmd.Vram()
+    assert vram.load_tim(tim_bytes(0, (64, 0, words), (0, 480, [palette])))
+    assert vram.has_page(1)
+    texture = vram.texture(1, 480 << 6, COLOUR_4BIT)
+    assert texture.shape == (256, 256, 4)
+    assert np.array_equal(texture[:2, :8], rgba(np.array(palette)[texels]))
+
+
+def test_8bit_texture():
+    palette = np.zeros(256, dtype=np.uint16)
+    palette[[7, 200, 255]] = [RED, GREEN, BLUE]
+    texels = np.array([[7, 200, 255, 0], [255, 255, 7, 7]])
+    words = texels[:, 0::2] | (texels[:, 1::2] << 8)
+
+    vram = psxtmd.Vram()
+    assert vram.load_tim(tim_bytes(1, (128, 256, words), (16, 500, [palette])))
+    #Page 2 of the bottom row, CLUT x is stored in 16 word units
+    texture = vram.texture(2 | 0x10, (500 << 6) | 1, COLOUR_8BIT)
+    assert np.array_equal(texture[:2, :4], rgba(palette[texels]))
+
+
+def test_15bit_texture():
+    words = np.array([[RED, GREEN, BLUE], [WHITE, 0, RED | 0x8000]])
+    vram = psxtmd.Vram()
+    assert vram.load_tim(tim_bytes(2, (320, 0, words)))
+    texture = vram.texture(5, 0, COLOUR_15BIT)
+    assert texture[:2, :3].tolist() == rgba(words & 0x7FFF).tolist()
+
+
+def test_truncated_tim_leaves_vram_untouched():
+    data = tim_bytes(2, (0, 0, np.full((4, 4), WHITE)), (0, 480, [[RED] * 16]))
+    vram = psxtmd.Vram()
+    assert not vram.load_tim(data[:-2])
+    assert not vram.words.any()
+    assert not psxtmd.is_tim(b"\x11\0\0\0\0\0\0\0")
@@ -0,0 +1,68 @@
+import numpy as np
+
+import psxtmd
+
+
+def triangle_mesh(mode, flag, normals, corner_normals, dedup_normals=False):
+    #Two triangles over a quad of vertices, sharing the 1-2 edge
+    #mode and flag are one value or one per face
+    vertices = np.array([[0, 0, 0], [100, 0, 0], [0, 100, 0], [100, 100, 0]], dtype=np.int16)
+    modes = np.full(2, mode, dtype=np.uint8)
+    return psxtmd.TmdMesh(
+        "0",
+        vertices,
+        np.asarray(normals, dtype=np.float32).reshape(-1, 3),
+        np.array([0, 3, 6], dtype=np.int32),
+        np.array([0, 1, 2, 1, 3, 2], dtype=np.int32),
+        np.asarray(corner_normals, dtype=np.int32),
+        (np.arange(12, dtype=np.uint8) * 20).reshape(6, 2),
+        np.full(2, 480 << 6, dtype=np.uint16),
+        np.array([5, 6], dtype=np.uint16),
+        modes,
+        np.full(2, flag, dtype=np.uint8),
+        np.array([[200, 100, 50], [10, 20, 30]], dtype=np.uint8),
+        psxtmd.face_flags_from_modes(modes),
+        dedup_normals=dedup_normals,
+    )
+
+
+def test_parse_serialize_parse_round_trip():
+    normals = [[0, 0, 1], [0, 1, 0], [1, 0, 0]]
+    meshes = [
+        triangle_mesh([0x34, 0x20], 0, normals, [0, 1, 2, 1, 1, 1]),
+        triangle_mesh([0x24, 0x30], 0, normals, [2, 2, 2, 0, 1, 2]),
+    ]
+    data = psxtmd.serialize(psxtmd.TmdFile(meshes))
+    tmd = psxtmd.parse(data)
+    assert psxtmd.serialize(tmd) == data
+
+    assert len(tmd) == 2
+    for mesh, back in zip(meshes, tmd):
+        for field in ('vertices', 'normals', 'face_offsets', 'corner_vertices', 'corner_normals', 'mode', 'flag'):
+            assert np.array_equal(getattr(back, field), getattr(mesh, field)), field
+        textured = back.is_uvs
+        assert np.array_equal(textured, mesh.is_uvs)
+        assert np.array_equal(back.corner_uvs[np.repeat(textured, 3)], mesh.corner_uvs[np.repeat(textured, 3)])
+        assert np.array_equal(back.cba[textured], mesh.cba[textured])
+        assert np.array_equal(back.tsb[textured], mesh.tsb[textured])
+        assert np.array_equal(back.rgb[~textured], mesh.rgb[~textured])
+
+
+def test_flat_normals_survive_round_trip():
+    mesh = triangle_mesh(0x20, 0, [[0, 0, 1], [0, 1, 0]], [0, 0, 0, 1, 1, 1])
+    back = psxtmd.parse(psxtmd.serialize(psxtmd.TmdFile([mesh]))).meshes[0]
+    assert back.normals.tolist() == [[0, 0, 1], [0, 1, 0]]
+    assert back.corner_normals.tolist() == [0, 0, 0, 1, 1, 1]
+
+
+def test_nf_object_without_normals():
+    #0x21 with flag 1 is an unlit triangle, valid with an empty normal table
+    for dedup_normals in (False, True):
+        mesh = triangle_mesh(0x21, 1, np.zeros((0, 3)), [0] * 6, dedup_normals)
+        data = psxtmd.serialize(psxtmd.TmdFile([mesh]))
+        back = psxtmd.parse(data).meshes[0]
+        assert psxtmd.serialize(psxtmd.parse(data)) == data
+        assert len(back.normals) == 0
+        assert back.corner_vertices.tolist() == [0, 1, 2, 1, 3, 2]
+        assert back.flag.tolist() == [1, 1]
+        assert back.rgb.tolist() == mesh.rgb.tolist()